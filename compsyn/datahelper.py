@@ -3,6 +3,7 @@ from __future__ import annotations
 
 import os
 from collections import defaultdict
+from multiprocessing.pool import ThreadPool
 
 import PIL
 import numpy as np
@@ -47,17 +48,7 @@ class ImageData:
         if label is None:
             label = path.split("/")[-1]
         files = os.listdir(path)
-        imglist = []
-        arraylist = []
-        for f in files:
-            fp = os.path.join(path, f)
-            img = None
-            try:
-                img = self.load_rgb_image(fp)
-            except ValueError as exc:
-                self.log.error(f"{exc} error loading rgb image from {fp}")
-            if img is not None:
-                imglist.append(img)
+        imglist = self.load_rgb_images([os.path.join(path, f) for f in files])
 
         self.log.debug(f'loaded {len(imglist)} images for "{label}"')
         self.rgb_dict[label] = imglist
@@ -77,20 +68,10 @@ class ImageData:
         assert os.path.isdir(path)
         path = os.path.realpath(path)
         label = label or path.split("/")[-1]
-        imglist = []
-        arraylist = []
 
         files_in_window = continuum_files[idx : idx + window]
 
-        for f in files_in_window:
-            fp = os.path.join(path, f)
-            img = None
-            try:
-                img = self.load_rgb_image(fp)
-            except ValueError as exc:
-                self.log.error(f"{exc} failed to load image {fp}")
-            if img is not None:
-                imglist.append(img)
+        imglist = self.load_rgb_images([os.path.join(path, f) for f in files_in_window])
 
         if compute_jzazbz:
             self.store_jzazbz_from_rgb(label)
@@ -114,6 +95,25 @@ class ImageData:
             except Exception as exc:
                 raise ImageLoadingError(f"while loading {path}") from exc
 
+    def load_rgb_images(self, paths: List[Union[Path, str]]) -> List[np.ndarray]:
+        """
+        Load many rgb images with a thread pool, PIL releases the GIL while decoding and resizing.
+        Order of the returned images follows paths, images that fail to load are skipped.
+        """
+
+        def _load(fp: Union[Path, str]) -> Optional[np.ndarray]:
+            try:
+                return self.load_rgb_image(fp)
+            except ImageLoadingError as exc:
+                self.log.error(f"{exc.__cause__!r} error loading rgb image from {fp}")
+
+        with ThreadPool(
+            processes=int(os.getenv("COMPSYN_THREAD_POOL_SIZE", 4))
+        ) as pool:
+            images = pool.map(_load, paths)
+
+        return [img for img in images if img is not None]
+
     def store_jzazbz_from_rgb(
         self, labels: Optional[Union[str, List[str]]] = None
     ) -> None:
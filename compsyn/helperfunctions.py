@@ -5,22 +5,19 @@ from __future__ import annotations
 
 import argparse
 import datetime
-import hashlib
-import io
 import json
 import os
-import random
-import requests
-import time
-from collections import defaultdict
+from functools import lru_cache
 from pathlib import Path
 
-from PIL import Image, UnidentifiedImageError
 from google.cloud import vision_v1p2beta1 as vision
 
 from .logger import get_logger
 from .utils import env_default
 
+#: maximum number of images the Vision API will annotate in a single request
+VISION_BATCH_SIZE = 16
+
 
 def get_google_application_args(
     parser: Optional[argparse.ArgumentParser] = None,
@@ -42,6 +39,15 @@ def get_google_application_args(
     return parser
 
 
+@lru_cache(maxsize=1)
+def get_vision_client() -> vision.ImageAnnotatorClient:
+    """
+       Creating a client sets up a gRPC channel and resolves credentials, so a single client is
+       shared by every call to run_google_vision
+    """
+    return vision.ImageAnnotatorClient()
+
+
 def run_google_vision(img_urls_dict: Dict[str, List[str]]) -> Dict[str, Dict[str, Any]]:
     """
        Use the Google vision API to return a set of classification labels for each image collected from 
@@ -60,37 +66,65 @@ def run_google_vision(img_urls_dict: Dict[str, List[str]]) -> Dict[str, Dict[str
         "COMPSYN_GOOGLE_APPLICATION_CREDENTIALS"
     )
 
-    client = vision.ImageAnnotatorClient()
-    image = vision.types.Image()
+    client = get_vision_client()
+    features = [vision.types.Feature(type=vision.enums.Feature.Type.LABEL_DETECTION)]
 
+    img_classified_dict = {}
     for search_term in img_urls_dict.keys():
         img_urls = img_urls_dict[search_term]
-        img_classified_dict = {}
         img_classified_dict[search_term] = {}
         log.info(f"Classifying {len(img_urls)} images for {search_term}")
 
-        for image_uri in img_urls:
+        # the API accepts a limited number of images per request, send them in batches
+        for start in range(0, len(img_urls), VISION_BATCH_SIZE):
+            batch_urls = img_urls[start : start + VISION_BATCH_SIZE]
+            annotate_requests = [
+                vision.types.AnnotateImageRequest(
+                    image=vision.types.Image(
+                        source=vision.types.ImageSource(image_uri=image_uri)
+                    ),
+                    features=features,
+                )
+                for image_uri in batch_urls
+            ]
             try:
-                image.source.image_uri = image_uri
-                response = client.label_detection(image=image)
-                img_classified_dict[image_uri] = {}
-
-                for label in response.label_annotations:
-                    img_classified_dict[search_term][image_uri] = {}
-                    img_classified_dict[search_term][image_uri][
-                        label.description
-                    ] = label.score
-
-            except:
-                pass
+                batch_response = client.batch_annotate_images(annotate_requests)
+            except Exception as exc:
+                log.warning(f"failed to classify {len(batch_urls)} images: {exc}")
+                continue
+
+            for image_uri, response in zip(batch_urls, batch_response.responses):
+                if response.error.message:
+                    log.debug(
+                        f"failed to classify {image_uri}: {response.error.message}"
+                    )
+                    continue
+                img_classified_dict[search_term][image_uri] = {
+                    label.description: label.score
+                    for label in response.label_annotations
+                }
 
     return img_classified_dict
 
 
-def write_to_json(to_save: Dict[str, Any], filename: str) -> None:
-    """ write dictionary to existing json file"""
-    with open(filename, "w") as to_write_to:
-        json.dump(to_save, to_write_to, indent=4)
+def write_to_json(to_save: Dict[str, Any], filename: Union[str, Path]) -> None:
+    """
+       write dictionary to a json file, replacing any existing file atomically so that readers
+       never see a partially written file
+    """
+    filename = Path(filename)
+    tmp_filename = filename.with_suffix(filename.suffix + ".tmp")
+    try:
+        with open(tmp_filename, "w") as to_write_to:
+            json.dump(to_save, to_write_to, separators=(",", ":"))
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        # don't leave a partially written temporary file behind (Path.unlink has no missing_ok on python 3.7)
+        try:
+            tmp_filename.unlink()
+        except FileNotFoundError:
+            pass
+        raise
 
 
 def write_img_classifications_to_file(
@@ -128,8 +162,8 @@ def write_img_classifications_to_file(
 
                 term_data_orig = json.loads(filename.read_text())
                 term_data_orig.update(term_data)
-                filename.write_text(json.dumps(term_data_orig))
+                write_to_json(term_data_orig, filename)
 
             else:
                 log.info("File new! Saving..")
-                filename.write_text(json.dumps(term_data, indent=2))
+                write_to_json(term_data, filename)
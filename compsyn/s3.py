@@ -9,14 +9,32 @@ Compsyn can be configured to optionally store data in S3.
 
 import argparse
 import os
+from functools import lru_cache
 from pathlib import Path
 
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from s3transfer.futures import NonThreadedExecutor
+from s3transfer.manager import TransferManager
+from s3transfer.subscribers import BaseSubscriber
 
 from .logger import get_logger
 from .utils import env_default
 
 
+#: connection pool size shared by all threads using the cached client
+S3_MAX_POOL_CONNECTIONS = 32
+
+#: objects above the multipart threshold are transferred in parts, several at a time
+S3_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=8,
+    use_threads=True,
+)
+
+
 class S3Error(Exception):
     pass
 
@@ -25,6 +43,25 @@ class NoObjectInS3Error(S3Error):
     pass
 
 
+class _IfMatchTransferManager(TransferManager):
+    """ TransferManager that passes IfMatch through to the ranged GETs of a download """
+
+    ALLOWED_DOWNLOAD_ARGS = TransferManager.ALLOWED_DOWNLOAD_ARGS + ["IfMatch"]
+
+
+class _KnownObjectSubscriber(BaseSubscriber):
+    """ Provides the size (and ETag) of an object up front, so the transfer manager does not HEAD it first """
+
+    def __init__(self, s3_head: Dict[str, Any]) -> None:
+        self._s3_head = s3_head
+
+    def on_queued(self, future: TransferFuture, **kwargs) -> None:
+        future.meta.provide_transfer_size(self._s3_head["ContentLength"])
+        if hasattr(future.meta, "provide_object_etag"):
+            # newer s3transfer releases also HEAD for the ETag unless it is provided
+            future.meta.provide_object_etag(self._s3_head["ETag"])
+
+
 def get_s3_args(
     parser: Optional[argparse.ArgumentParser] = None,
 ) -> argparse.ArgumentParser:
@@ -82,8 +119,7 @@ def get_s3_client(args: argparse.Namespace) -> botocore.clients.s3:
     assert args.s3_secret_access_key is not None, "set COMPSYN_S3_SECRET_ACCESS_KEY"
     assert args.s3_bucket is not None, "set COMPSYN_S3_BUCKET"
 
-    return boto3.session.Session().client(
-        "s3",
+    return _cached_s3_client(
         region_name=args.s3_region_name,
         endpoint_url=args.s3_endpoint_url,
         aws_access_key_id=args.s3_access_key_id,
@@ -91,30 +127,61 @@ def get_s3_client(args: argparse.Namespace) -> botocore.clients.s3:
     )
 
 
+@lru_cache(maxsize=None)
+def _cached_s3_client(
+    region_name: str,
+    endpoint_url: Optional[str],
+    aws_access_key_id: str,
+    aws_secret_access_key: str,
+) -> botocore.clients.s3:
+    """
+        boto clients are thread safe, so one client per set of credentials is shared across calls.
+        This keeps HTTP connections alive between requests instead of paying a new TLS handshake each time.
+    """
+
+    return boto3.session.Session().client(
+        "s3",
+        region_name=region_name,
+        endpoint_url=endpoint_url,
+        aws_access_key_id=aws_access_key_id,
+        aws_secret_access_key=aws_secret_access_key,
+        config=Config(
+            max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+            retries={"max_attempts": 3, "mode": "standard"},
+        ),
+    )
+
+
 def s3_object_exists(s3_path: Path) -> bool:
-    """ Check whether a given path in S3 exists """
+    """ Check whether a given path in S3 exists, using HEAD so that no object body is transferred """
+
+    return s3_object_head(s3_path) is not None
+
+
+def s3_object_head(s3_path: Path) -> Optional[Dict[str, Any]]:
+    """ Fetch metadata (ETag, ContentLength, ...) for an S3 object without its body, None if it does not exist """
 
     s3_args, unknown = get_s3_args().parse_known_args()
     s3_client = get_s3_client(s3_args)
-    log = get_logger("s3_object_exists")
 
     try:
-        s3_client.get_object(Bucket=s3_args.s3_bucket, Key=str(s3_path))
-        return True
-    except s3_client.exceptions.NoSuchKey:
-        return False
+        return s3_client.head_object(Bucket=s3_args.s3_bucket, Key=str(s3_path))
+    except s3_client.exceptions.ClientError as exc:
+        if exc.response["Error"]["Code"] in ["404", "NoSuchKey", "NotFound"]:
+            return None
+        raise
 
 
 class NoS3DataError(Exception):
     pass
 
 
-def list_object_paths_in_s3(s3_prefix: Path) -> Generator[Path]:
-    """ Paginate contents at an S3 prefix, yielding Paths to S3 objects """
+def list_objects_in_s3(s3_prefix: Path) -> Generator[Dict[str, Any]]:
+    """ Paginate contents at an S3 prefix, yielding the listed objects (Key, Size, ETag, ...) """
 
     s3_args, unknown = get_s3_args().parse_known_args()
     s3_client = get_s3_client(s3_args)
-    log = get_logger("list_object_paths_in_s3")
+    log = get_logger("list_objects_in_s3")
 
     resp = s3_client.list_objects_v2(Bucket=s3_args.s3_bucket, Prefix=str(s3_prefix))
 
@@ -122,7 +189,7 @@ def list_object_paths_in_s3(s3_prefix: Path) -> Generator[Path]:
         raise NoS3DataError(f"No data at prefix {s3_prefix}")
 
     while True:
-        yield from (Path(obj["Key"]) for obj in resp["Contents"])
+        yield from resp["Contents"]
 
         if resp["IsTruncated"]:
             continuation_key = resp["NextContinuationToken"]
@@ -135,46 +202,110 @@ def list_object_paths_in_s3(s3_prefix: Path) -> Generator[Path]:
             break
 
 
-def upload_file_to_s3(local_path: Path, s3_path: Path, overwrite: bool = False) -> None:
-    """ By default, existing S3 objects are not overwritten """
+def list_object_paths_in_s3(s3_prefix: Path) -> Generator[Path]:
+    """ Paginate contents at an S3 prefix, yielding Paths to S3 objects """
+
+    yield from (Path(obj["Key"]) for obj in list_objects_in_s3(s3_prefix))
+
+
+def _s3_client_error(
+    s3_client: botocore.clients.s3, s3_args: argparse.Namespace, s3_path: Path
+) -> S3Error:
+    """ Wrap a ClientError raised while communicating with s3, with client details attached """
+
+    s3_client_attributes = {
+        attr: getattr(s3_client, attr) for attr in s3_client.__dict__.keys()
+    }
+    s3_client_attributes.update(
+        {"bucket": s3_args.s3_bucket, "object_path": str(s3_path),}
+    )
+    return S3Error(f"{s3_client_attributes} S3 ClientError")
+
+
+def upload_file_to_s3(
+    local_path: Path, s3_path: Path, overwrite: bool = False
+) -> Optional[str]:
+    """ By default, existing S3 objects are not overwritten. Returns the ETag of the uploaded object, if uploaded """
     import warnings
 
     warnings.filterwarnings(
         action="ignore", message="unclosed", category=ResourceWarning
     )
 
+    if local_path.stat().st_size < S3_TRANSFER_CONFIG.multipart_threshold:
+        # a single PUT is cheapest for small files, and returns the ETag directly
+        return upload_bytes_to_s3(
+            body=local_path.read_bytes(), s3_path=s3_path, overwrite=overwrite
+        )
+
     s3_args, unknown = get_s3_args().parse_known_args()
     s3_client = get_s3_client(s3_args)
     log = get_logger("upload_file_to_s3")
 
     try:
         # only write files to s3 that don't already exist unless overwrite is passed
-        if s3_object_exists(s3_path) and not overwrite:
+        if not overwrite and s3_object_exists(s3_path):
             log.debug(
                 f"s3://{s3_args.s3_bucket}/{s3_path} already exists in s3, not overwriting"
             )
-            return
+            return None
 
-        s3_client.put_object(
-            Body=local_path.read_bytes(), Bucket=s3_args.s3_bucket, Key=str(s3_path)
+        s3_client.upload_file(
+            Filename=str(local_path),
+            Bucket=s3_args.s3_bucket,
+            Key=str(s3_path),
+            Config=S3_TRANSFER_CONFIG,
         )
+        etag = s3_client.head_object(Bucket=s3_args.s3_bucket, Key=str(s3_path))[
+            "ETag"
+        ]
         log.debug(f"uploaded s3://{s3_args.s3_bucket}/{s3_path}")
+        return etag
 
     except s3_client.exceptions.ClientError:
         # catch and raise any errors generated while attempting to communicate with s3
-        s3_client_attributes = {
-            attr: getattr(s3_client, attr) for attr in s3_client.__dict__.keys()
-        }
-        s3_client_attributes.update(
-            {"bucket": bucket, "object_path": object_path,}
-        )
-        raise S3Error(f"{s3_client_attributes} S3 ClientError")
+        raise _s3_client_error(s3_client, s3_args, s3_path)
+
+
+def upload_bytes_to_s3(
+    body: bytes, s3_path: Path, overwrite: bool = False
+) -> Optional[str]:
+    """ Upload in-memory data, by default existing S3 objects are not overwritten. Returns the ETag of the uploaded object, if uploaded """
+
+    s3_args, unknown = get_s3_args().parse_known_args()
+    s3_client = get_s3_client(s3_args)
+    log = get_logger("upload_bytes_to_s3")
+
+    try:
+        # only write objects to s3 that don't already exist unless overwrite is passed
+        if not overwrite and s3_object_exists(s3_path):
+            log.debug(
+                f"s3://{s3_args.s3_bucket}/{s3_path} already exists in s3, not overwriting"
+            )
+            return None
+
+        etag = s3_client.put_object(
+            Body=body, Bucket=s3_args.s3_bucket, Key=str(s3_path)
+        )["ETag"]
+        log.debug(f"uploaded s3://{s3_args.s3_bucket}/{s3_path}")
+        return etag
+
+    except s3_client.exceptions.ClientError:
+        # catch and raise any errors generated while attempting to communicate with s3
+        raise _s3_client_error(s3_client, s3_args, s3_path)
 
 
 def download_file_from_s3(
-    local_path: Path, s3_path: Path, overwrite: bool = False
+    local_path: Path,
+    s3_path: Path,
+    overwrite: bool = False,
+    s3_head: Optional[Dict[str, Any]] = None,
 ) -> None:
-    """ By default, local Paths are not overwritten """
+    """
+        By default, local Paths are not overwritten.
+        Pass s3_head (ETag and ContentLength, from s3_object_head or a listing) when it is already known,
+        the download then makes no request to find the object's size, and fails if the object no longer has that ETag.
+    """
 
     import warnings
 
@@ -191,19 +322,38 @@ def download_file_from_s3(
         if local_path.is_file():
             if not overwrite:
                 log.debug(f"{local_path} already exists locally, not overwriting")
-                return
+                return None
 
-        s3_obj = s3_client.get_object(Bucket=s3_args.s3_bucket, Key=str(s3_path))
         local_path.parent.mkdir(exist_ok=True, parents=True)
-        local_path.write_bytes(s3_obj["Body"].read())
+        extra_args = dict() if s3_head is None else {"IfMatch": s3_head["ETag"]}
+        if (
+            s3_head is None
+            or s3_head["ContentLength"] < S3_TRANSFER_CONFIG.multipart_threshold
+        ):
+            # a single GET, the transfer manager would HEAD an object of unknown size before fetching it
+            s3_obj = s3_client.get_object(
+                Bucket=s3_args.s3_bucket, Key=str(s3_path), **extra_args
+            )
+            local_path.write_bytes(s3_obj["Body"].read())
+        else:
+            # large object of known size, fetch ranged parts concurrently
+            # same executor choice as boto3's create_transfer_manager, which has no IfMatch passthrough
+            with _IfMatchTransferManager(
+                s3_client,
+                config=S3_TRANSFER_CONFIG,
+                executor_cls=None
+                if S3_TRANSFER_CONFIG.use_threads
+                else NonThreadedExecutor,
+            ) as transfer_manager:
+                transfer_manager.download(
+                    bucket=s3_args.s3_bucket,
+                    key=str(s3_path),
+                    fileobj=str(local_path),
+                    extra_args=extra_args,
+                    subscribers=[_KnownObjectSubscriber(s3_head)],
+                ).result()
         log.debug(f"downloaded {local_path} from s3")
 
     except s3_client.exceptions.ClientError:
         # catch and raise any errors generated while attempting to communicate with s3
-        s3_client_attributes = {
-            attr: getattr(s3_client, attr) for attr in s3_client.__dict__.keys()
-        }
-        s3_client_attributes.update(
-            {"bucket": bucket, "object_path": object_path,}
-        )
-        raise S3Error(f"{s3_client_attributes} S3 ClientError")
+        raise _s3_client_error(s3_client, s3_args, s3_path)
@@ -6,6 +6,7 @@
 from __future__ import annotations
 
 import argparse
+import io
 import os
 import tempfile
 import logging
@@ -108,17 +109,29 @@ def compress_image(image_path: Path, quality: int = 30) -> Path:
         action="ignore", message="Implicitly cleaning", category=ResourceWarning
     )
 
-    image = Image.open(image_path)
+    compressed_image = compress_image_to_bytes(image_path, quality=quality)
 
     temp_work_dir = Path(tempfile.TemporaryDirectory().name)
     temp_work_dir.mkdir(exist_ok=True, parents=True)
     compressed_image_path = temp_work_dir.joinpath(image_path.name)
 
-    image.save(compressed_image_path, optimize=True, quality=quality)
+    compressed_image_path.write_bytes(compressed_image)
 
     return compressed_image_path
 
 
+def compress_image_to_bytes(image_path: Path, quality: int = 30) -> bytes:
+    """ Same compression as compress_image, encoded in memory so callers can skip the disk round trip """
+
+    buffer = io.BytesIO()
+    with Image.open(image_path) as image:
+        # encode to the format implied by the file extension, as Image.save(path) would
+        image_format = Image.registered_extensions()[Path(image_path).suffix.lower()]
+        image.save(buffer, format=image_format, optimize=True, quality=quality)
+
+    return buffer.getvalue()
+
+
 def human_bytes(num, suffix="B") -> str:
     """ Create human readable representation of a number of bytes """
     for unit in ["", "Ki", "Mi", "Gi", "Ti", "Pi", "Ei", "Zi"]:
@@ -1,20 +1,32 @@
 from __future__ import annotations
 
+import io
+import mmap
+import os
 import pickle
 from pathlib import Path
 
+import zstandard as zstd
+
 from .logger import get_logger
 from .trial import Trial, get_trial_from_env
 from .s3 import (
     upload_file_to_s3,
     download_file_from_s3,
-    s3_object_exists,
+    s3_object_head,
     NoObjectInS3Error,
 )
 from .utils import human_bytes
 from .config import CompsynConfig
 
 
+#: every zstd frame starts with these bytes, pickles saved before compression was introduced do not
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+#: protocol 5 (HIGHEST_PROTOCOL on python 3.8+) cannot be read by python 3.7, which compsyn still supports
+PICKLE_PROTOCOL = 4
+
+
 class VectorNotGeneratedError(Exception):
     pass
 
@@ -27,12 +39,26 @@ class BadPickleError(Exception):
     pass
 
 
+def _etag_path(local_pickle_path: Path) -> Path:
+    """ records the ETag of the remote pickle the local pickle was last synced with """
+    return local_pickle_path.with_suffix(".etag")
+
+
 def load_vector_pickle(filename: Union[str, Path]) -> Any:
     """
-    load a saved pickle
+    load a saved pickle, either zstd compressed or plain
+    the file is memory mapped, so pickle bytes are read straight from the page cache
     """
     with open(filename, "rb") as f:
-        obj = pickle.load(f)
+        # mmap refuses empty files, e.g. a save interrupted before anything was written
+        if os.fstat(f.fileno()).st_size == 0:
+            raise BadPickleError(f"{filename} is empty")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[: len(ZSTD_MAGIC)] == ZSTD_MAGIC:
+                with io.BufferedReader(zstd.ZstdDecompressor().stream_reader(mm)) as zf:
+                    obj = pickle.load(zf)
+            else:
+                obj = pickle.loads(mm)
         get_logger("load_pickle").info(f"loaded pickle from {filename}")
         return obj
 
@@ -100,6 +126,19 @@ class Vector:
             self.vector_pickle_path
         )
 
+    @staticmethod
+    def _local_pickle_matches(local_pickle_path: Path, s3_head: Dict[str, Any]) -> bool:
+        """
+        Whether the local pickle is the same object as the remote one described by s3_head
+        """
+        etag_path = _etag_path(local_pickle_path)
+        return (
+            local_pickle_path.is_file()
+            and etag_path.is_file()
+            and etag_path.read_text() == s3_head["ETag"]
+            and local_pickle_path.stat().st_size == s3_head["ContentLength"]
+        )
+
     @property
     def vector_pickle_path(self) -> Path:
         if self.revision is None:
@@ -117,10 +156,12 @@ class Vector:
         """
         Load and return a vector from a pickle file
         """
-        if not self._local_pickle_path.is_file():
-            raise FileNotFoundError(self._local_pickle_path)
+        # resolving the local path reads the compsyn config, only do it once
+        local_pickle_path = self._local_pickle_path
+        if not local_pickle_path.is_file():
+            raise FileNotFoundError(local_pickle_path)
 
-        obj = load_vector_pickle(self._local_pickle_path)
+        obj = load_vector_pickle(local_pickle_path)
         if not isinstance(obj, self.__class__):
             raise BadPickleError(
                 f"{obj.__class__.__name__} loaded from pickle is not a {self.__class__}."
@@ -129,16 +170,23 @@ class Vector:
         # is it a bad idea to replace self like this?
         self.__dict__.update(obj.__dict__)
 
-    def save(self) -> None:
+    def save(self) -> Path:
         """
-        save a Vector as a pickle
+        save a Vector as a zstd compressed pickle, returns the local path it was saved to
         """
-        self._local_pickle_path.parent.mkdir(exist_ok=True, parents=True)
-        with open(self._local_pickle_path, "wb") as f:
-            pickle.dump(self, f)
+        local_pickle_path = self._local_pickle_path
+        local_pickle_path.parent.mkdir(exist_ok=True, parents=True)
+        with open(local_pickle_path, "wb") as f:
+            with zstd.ZstdCompressor(level=6, threads=-1).stream_writer(f) as zf:
+                pickle.dump(self, zf, protocol=PICKLE_PROTOCOL)
+        # the local pickle no longer corresponds to any remote object
+        etag_path = _etag_path(local_pickle_path)
+        if etag_path.is_file():
+            etag_path.unlink()
         self.log.info(
-            f"saved {human_bytes(self._local_pickle_path.stat().st_size)} pickle to {self._local_pickle_path}"
+            f"saved {human_bytes(local_pickle_path.stat().st_size)} pickle to {local_pickle_path}"
         )
+        return local_pickle_path
 
     def pull(
         self, include_pickle: bool = True, overwrite: bool = False, **kwargs
@@ -148,13 +196,32 @@ class Vector:
         Subclasses of Vector should call super().pull(**kwargs) if they extend pull
         """
         if include_pickle:
-            if not s3_object_exists(s3_path=self.vector_pickle_path):
+            local_pickle_path = self._local_pickle_path
+            vector_pickle_path = self.vector_pickle_path
+            s3_head = s3_object_head(s3_path=vector_pickle_path)
+            if s3_head is None:
                 raise NoObjectInS3Error(
                     f"no S3 object exists for this Vector / Trial combination:\n\t{self.label}.{self.revision} {self.trial}"
                 )
-            download_file_from_s3(
-                local_path=self._local_pickle_path, s3_path=self.vector_pickle_path,
-            )
+            if not overwrite and self._local_pickle_matches(local_pickle_path, s3_head):
+                self.log.debug(f"local pickle is up to date with remote, not pulling")
+            elif (
+                not overwrite
+                and local_pickle_path.is_file()
+                and not _etag_path(local_pickle_path).is_file()
+            ):
+                # saved locally since the last sync (or before syncs were tracked), may hold unpushed work
+                self.log.warning(
+                    f"{local_pickle_path} was not pulled from remote and may have local changes, not pulling. Pass overwrite=True to replace it"
+                )
+            else:
+                download_file_from_s3(
+                    local_path=local_pickle_path,
+                    s3_path=vector_pickle_path,
+                    overwrite=True,
+                    s3_head=s3_head,
+                )
+                _etag_path(local_pickle_path).write_text(s3_head["ETag"])
             self.load()
 
     def push(
@@ -165,10 +232,12 @@ class Vector:
         Subclasses of Vector should call super().push(**kwargs) if they extend push
         """
         if include_pickle:
-            self.save()
-            upload_file_to_s3(
-                local_path=self._local_pickle_path, s3_path=self.vector_pickle_path,
+            local_pickle_path = self.save()
+            etag = upload_file_to_s3(
+                local_path=local_pickle_path, s3_path=self.vector_pickle_path,
             )
+            if etag is not None:
+                _etag_path(local_pickle_path).write_text(etag)
 
     # @abstractmethod
     def run_analysis(**kwargs) -> None:
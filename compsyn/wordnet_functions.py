@@ -1,6 +1,6 @@
 # Need to check imports carefully
-import os
 import random
+from pathlib import Path
 
 import pandas as pd
 from nltk.corpus import wordnet as wn
@@ -90,8 +90,6 @@ def get_tree_structure(tree, home):
     Tree: dictionary of search terms and their corresponding parents and children in WordNet's taxonomy
     """
 
-    os.chdir(home)
-
     tree_data = pd.DataFrame(
         columns=["ref_term", "new_term", "role", "synset", "Branch_fact", "Num_senses"]
     )
@@ -166,17 +164,12 @@ def get_tree_structure(tree, home):
     new_searchterms = list(set(tree_data["new_term"].values))
     new_searchterms = [t.replace("_", " ") for t in new_searchterms]
 
-    tree_data_path = "tree_data/"
-    try:
-        os.mkdir(tree_data_path)
-    except:
-        pass
-
-    os.chdir(tree_data_path)
+    tree_data_path = Path(home).joinpath("tree_data")
+    tree_data_path.mkdir(exist_ok=True, parents=True)
 
     for term in tree.keys():
         tree_data_term = tree_data[tree_data["ref_term"] == term]
-        tree_data_term.to_json(r"tree_data_" + term + ".json")
+        tree_data_term.to_json(tree_data_path.joinpath("tree_data_" + term + ".json"))
 
     return tree_data, new_searchterms
 
@@ -199,14 +192,11 @@ def get_wordnet_tree_data(search_terms, home, get_trees=True):
             tree_data, new_searchterms = get_tree_structure(tree, home)
             final_wordlist = search_terms + new_searchterms
 
-            os.chdir(home)
             return final_wordlist, tree, tree_data
 
         except Exception as exc:
-            os.chdir(home)
             log.error(f"No tree available due to error {exc}")
-            return wordlist, {}, {}
+            return search_terms, {}, {}
 
     else:
-        os.chdir(home)
-        return wordlist, {}, {}
+        return search_terms, {}, {}
@@ -20,8 +20,8 @@ from .datahelper import ImageData, rgb_array_to_jzazbz_array
 from .analysis import ImageAnalysis
 from .vector import Vector
 from .logger import get_logger
-from .s3 import upload_file_to_s3, download_file_from_s3, list_object_paths_in_s3
-from .utils import compress_image
+from .s3 import upload_bytes_to_s3, download_file_from_s3, list_objects_in_s3
+from .utils import compress_image_to_bytes
 from .texture import get_wavelet_embedding
 
 
@@ -106,12 +106,18 @@ class WordToColorVector(Vector):
 
     def run_image_capture(
         self,
-        max_items: int = 100,
+        max_items: Optional[int] = None,
         extra_query_params: Optional[Dict[str, str]] = None,
         include_related: bool = False,
         overwrite: bool = False,
     ) -> None:
-        """ Gather images from Google Images sets the attribute `self.raw_image_urls`"""
+        """
+        Gather images from Google Images sets the attribute `self.raw_image_urls`
+        By default, only as many images as `self.number_of_images` are requested
+        """
+
+        if max_items is None:
+            max_items = self.number_of_images
 
         # check if there are already raw images available already
         try:
@@ -128,7 +134,7 @@ class WordToColorVector(Vector):
             raw_images_available = 0
 
         # allow a small failure rate, as a small percentage of downloads will fail
-        if raw_images_available >= 0.90 * self.number_of_images:
+        if raw_images_available >= 0.90 * max_items:
             self.log.info(f"{raw_images_available} raw images already downloaded")
             if self.raw_image_urls is None:
                 self.log.debug(
@@ -222,9 +228,11 @@ class WordToColorVector(Vector):
         ax.set_axis_off()
         plt.show()
 
-    def save(self) -> None:
+    def save(self) -> Path:
         # clear some of the bulkier analysis data, raw data is still available
-        to_be_saved = copy.deepcopy(self)
+        # a shallow copy is enough, attributes are only removed from the copy's own __dict__
+        # and deep copying would duplicate every loaded image array just to discard it
+        to_be_saved = copy.copy(self)
         did_clean = False
         for del_attr in [
             "image_analysis",
@@ -241,25 +249,24 @@ class WordToColorVector(Vector):
                 delattr(to_be_saved, del_attr)
                 did_clean = True
         if did_clean:
-            to_be_saved.save()
+            return to_be_saved.save()
         else:
-            super().save()
+            return super().save()
 
     def _threaded_compressed_s3_upload(
         self, local_image_path: Path, overwrite: bool = False
     ) -> None:
         try:
-            compressed_image_path = compress_image(local_image_path)
+            compressed_image = compress_image_to_bytes(local_image_path)
         except IsADirectoryError:
             # may have directories in the raw images folder, ignore them.
             return
-        upload_file_to_s3(
-            local_path=compressed_image_path,
+        # upload straight from memory, no temporary file to write, read back and clean up
+        upload_bytes_to_s3(
+            body=compressed_image,
             s3_path=self.raw_images_path.joinpath(local_image_path.name),
             overwrite=overwrite,
         )
-        compressed_image_path.unlink()
-        compressed_image_path.parent.rmdir()
 
     def push(
         self, include_raw_images: bool = False, overwrite: bool = False, **kwargs
@@ -271,32 +278,41 @@ class WordToColorVector(Vector):
             local_paths = list(self._local_raw_images_path.iterdir())
             start = time.time()
             func = partial(self._threaded_compressed_s3_upload, overwrite=overwrite)
-            with ThreadPool(processes=os.getenv("COMPSYN_THREAD_POOL_SIZE", 4)) as pool:
+            with ThreadPool(
+                processes=int(os.getenv("COMPSYN_THREAD_POOL_SIZE", 4))
+            ) as pool:
                 pool.map(func, local_paths)
             self.log.info(
                 f"pushed {len(local_paths)} raw images to remote in {int(time.time()-start)} seconds"
             )
 
-    def _threaded_s3_download(self, s3_path: Path, overwrite: bool = False) -> None:
+    def _threaded_s3_download(
+        self, s3_object: Dict[str, Any], overwrite: bool = False
+    ) -> None:
+        s3_path = Path(s3_object["Key"])
         download_file_from_s3(
             local_path=self._local_raw_images_path.joinpath(s3_path.name),
             s3_path=s3_path,
             overwrite=overwrite,
+            # the listing already has each image's size and ETag, no need to HEAD it
+            s3_head={"ETag": s3_object["ETag"], "ContentLength": s3_object["Size"]},
         )
 
     def pull(
         self, include_raw_images: bool = False, overwrite: bool = False, **kwargs
     ) -> None:
-        super().pull(**kwargs)
+        super().pull(overwrite=overwrite, **kwargs)
         if include_raw_images:
             # pull raw images
             self._local_raw_images_path.mkdir(exist_ok=True, parents=True)
             self.log.debug(f"pulling raw images (ovewrite={overwrite})...")
-            s3_paths = list(list_object_paths_in_s3(s3_prefix=self.raw_images_path))
+            s3_objects = list(list_objects_in_s3(s3_prefix=self.raw_images_path))
             start = time.time()
             func = partial(self._threaded_s3_download, overwrite=overwrite)
-            with ThreadPool(processes=os.getenv("COMPSYN_THREAD_POOL_SIZE", 4)) as pool:
-                pool.map(func, s3_paths)
+            with ThreadPool(
+                processes=int(os.getenv("COMPSYN_THREAD_POOL_SIZE", 4))
+            ) as pool:
+                pool.map(func, s3_objects)
             self.log.info(
-                f"pulled {len(s3_paths)} raw images from remote in {int(time.time()-start)} seconds"
+                f"pulled {len(s3_objects)} raw images from remote in {int(time.time()-start)} seconds"
             )
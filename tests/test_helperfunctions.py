@@ -0,0 +1,95 @@
+from __future__ import annotations
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from compsyn.helperfunctions import VISION_BATCH_SIZE, run_google_vision, write_to_json
+
+FAKE_LABELS = {"dog": 0.98, "mammal": 0.87, "snout": 0.65}
+
+
+class FakeVisionClient:
+    """
+    records the image uris of each batch request, labels every image with FAKE_LABELS
+    except for uris containing "broken", which get a per-image error
+    """
+
+    def __init__(self) -> None:
+        self.batches = list()
+
+    def batch_annotate_images(self, annotate_requests: List[Any]) -> SimpleNamespace:
+        image_uris = [request.image.source.image_uri for request in annotate_requests]
+        self.batches.append(image_uris)
+        responses = list()
+        for image_uri in image_uris:
+            if "broken" in image_uri:
+                responses.append(
+                    SimpleNamespace(
+                        error=SimpleNamespace(message="could not fetch image"),
+                        label_annotations=[],
+                    )
+                )
+            else:
+                responses.append(
+                    SimpleNamespace(
+                        error=SimpleNamespace(message=""),
+                        label_annotations=[
+                            SimpleNamespace(description=description, score=score)
+                            for description, score in FAKE_LABELS.items()
+                        ],
+                    )
+                )
+        return SimpleNamespace(responses=responses)
+
+
+@pytest.mark.unit
+def test_run_google_vision_batches_requests(monkeypatch) -> None:
+    fake_client = FakeVisionClient()
+    monkeypatch.setattr(
+        "compsyn.helperfunctions.get_vision_client", lambda: fake_client
+    )
+    monkeypatch.setenv(
+        "COMPSYN_GOOGLE_APPLICATION_CREDENTIALS", "pytest-credentials.json"
+    )
+    monkeypatch.setenv("GOOGLE_APPLICATION_CREDENTIALS", "pytest-credentials.json")
+
+    img_urls_dict = {
+        "dog": [
+            f"https://example.com/dog-{i}.jpg" for i in range(VISION_BATCH_SIZE + 4)
+        ],
+        "cat": [
+            "https://example.com/cat-0.jpg",
+            "https://example.com/broken-cat.jpg",
+            "https://example.com/cat-1.jpg",
+        ],
+    }
+
+    img_classified_dict = run_google_vision(img_urls_dict)
+
+    # one request per VISION_BATCH_SIZE images, batches do not span search terms
+    assert [len(batch) for batch in fake_client.batches] == [VISION_BATCH_SIZE, 4, 3]
+
+    assert set(img_classified_dict.keys()) == {"dog", "cat"}
+    assert list(img_classified_dict["dog"].keys()) == img_urls_dict["dog"]
+    assert list(img_classified_dict["cat"].keys()) == [
+        "https://example.com/cat-0.jpg",
+        "https://example.com/cat-1.jpg",
+    ]
+    for search_term in img_classified_dict.keys():
+        for labels in img_classified_dict[search_term].values():
+            assert labels == FAKE_LABELS
+
+
+@pytest.mark.unit
+def test_write_to_json_leaves_no_partial_files(tmp_path) -> None:
+    json_path = tmp_path.joinpath("classifications.json")
+    write_to_json({"dog": FAKE_LABELS}, json_path)
+    assert json.loads(json_path.read_text()) == {"dog": FAKE_LABELS}
+
+    with pytest.raises(TypeError):
+        write_to_json({"dog": {"mammal": object()}}, json_path)
+
+    # the failed write neither replaced the existing file, nor left its temporary file behind
+    assert list(tmp_path.iterdir()) == [json_path]
+    assert json.loads(json_path.read_text()) == {"dog": FAKE_LABELS}
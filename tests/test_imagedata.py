@@ -4,6 +4,7 @@ from pathlib import Path
 
 import pytest
 import numpy as np
+from PIL import Image
 
 from compsyn.datahelper import ImageData, rgb_array_to_jzazbz_array
 
@@ -98,3 +99,23 @@ def test_load_image_dict_from_folder() -> None:
 # @pytest.mark.unit
 # def test_load_image_dict_from_subfolders() -> None
 #    pass
+
+
+@pytest.mark.unit
+def test_load_image_dict_from_folder_skips_unreadable_images(tmp_path) -> None:
+    rng = np.random.default_rng(0)
+    for name in ["a.png", "b.jpg"]:
+        Image.fromarray(rng.integers(0, 255, (16, 16, 3), dtype=np.uint8)).save(
+            tmp_path.joinpath(name)
+        )
+    tmp_path.joinpath("corrupt.jpg").write_bytes(b"not an image")
+    tmp_path.joinpath("notes.txt").write_text("not an image either")
+
+    image_data = ImageData(compress_dims=(8, 8))
+    image_data.load_image_dict_from_folder(
+        tmp_path, label="mixed", compute_jzazbz=False
+    )
+
+    assert len(image_data.rgb_dict["mixed"]) == 2
+    for rgb_array in image_data.rgb_dict["mixed"]:
+        assert rgb_array.shape == (8, 8, 3)
@@ -1,10 +1,17 @@
 from __future__ import annotations
+import argparse
+import io
 import time
 from pathlib import Path
 
+import boto3
 import pytest
+from boto3.s3.transfer import TransferConfig
+from botocore.response import StreamingBody
+from botocore.stub import ANY, Stubber
 
 from compsyn.s3 import (
+    S3Error,
     get_s3_args,
     get_s3_client,
     s3_object_exists,
@@ -27,6 +34,18 @@ def test_get_s3_client() -> None:
     get_s3_client(s3_args)
 
 
+@pytest.mark.unit
+def test_get_s3_client_is_reused() -> None:
+    s3_args = argparse.Namespace(
+        s3_region_name="us-east-1",
+        s3_endpoint_url=None,
+        s3_access_key_id="pytest-access-key-id",
+        s3_secret_access_key="pytest-secret-access-key",
+        s3_bucket="pytest-bucket",
+    )
+    assert get_s3_client(s3_args) is get_s3_client(s3_args)
+
+
 @pytest.mark.credentials
 def test_upload_file_to_s3() -> None:
     upload_file_to_s3(local_path=LOCAL_PATH, s3_path=S3_PATH)
@@ -60,3 +79,104 @@ def test_download_file_from_s3() -> None:
     download_file_from_s3(local_path=tmp_local_path, s3_path=S3_PATH, overwrite=True)
     tmp_local_path.unlink()
     assert not tmp_local_path.is_file()
+
+
+STUB_BUCKET = "pytest-bucket"
+STUB_ETAG = '"pytest-etag"'
+STUB_BODY = b"0123456789abcdefghij"
+
+
+def _get_object_response(body: bytes) -> Dict[str, Any]:
+    return {
+        "Body": StreamingBody(io.BytesIO(body), len(body)),
+        "ContentLength": len(body),
+        "ETag": STUB_ETAG,
+    }
+
+
+@pytest.fixture
+def s3_stubber(monkeypatch) -> Stubber:
+    """
+    any request that was not stubbed, such as an extra head_object, fails the test
+    """
+    s3_client = boto3.session.Session().client(
+        "s3",
+        region_name="us-east-1",
+        aws_access_key_id="pytest-access-key-id",
+        aws_secret_access_key="pytest-secret-access-key",
+    )
+    monkeypatch.setenv("COMPSYN_S3_BUCKET", STUB_BUCKET)
+    monkeypatch.setattr("compsyn.s3.get_s3_client", lambda s3_args: s3_client)
+    with Stubber(s3_client) as stubber:
+        yield stubber
+        stubber.assert_no_pending_responses()
+
+
+@pytest.mark.unit
+def test_download_file_from_s3_small_object_is_one_get(s3_stubber, tmp_path) -> None:
+    s3_stubber.add_response(
+        "get_object",
+        _get_object_response(STUB_BODY),
+        expected_params={"Bucket": STUB_BUCKET, "Key": "small", "IfMatch": STUB_ETAG},
+    )
+    local_path = tmp_path.joinpath("small")
+    download_file_from_s3(
+        local_path=local_path,
+        s3_path=Path("small"),
+        s3_head={"ETag": STUB_ETAG, "ContentLength": len(STUB_BODY)},
+    )
+    assert local_path.read_bytes() == STUB_BODY
+
+
+@pytest.mark.unit
+def test_download_file_from_s3_unknown_size_is_one_get(s3_stubber, tmp_path) -> None:
+    s3_stubber.add_response(
+        "get_object",
+        _get_object_response(STUB_BODY),
+        expected_params={"Bucket": STUB_BUCKET, "Key": "unknown"},
+    )
+    local_path = tmp_path.joinpath("unknown")
+    download_file_from_s3(local_path=local_path, s3_path=Path("unknown"))
+    assert local_path.read_bytes() == STUB_BODY
+
+
+@pytest.mark.unit
+def test_download_file_from_s3_large_object_skips_head(
+    s3_stubber, tmp_path, monkeypatch
+) -> None:
+    # parts of 8 bytes, fetched in order so the stubbed responses line up with their ranges
+    monkeypatch.setattr(
+        "compsyn.s3.S3_TRANSFER_CONFIG",
+        TransferConfig(multipart_threshold=8, multipart_chunksize=8, use_threads=False),
+    )
+    for start in range(0, len(STUB_BODY), 8):
+        s3_stubber.add_response(
+            "get_object",
+            _get_object_response(STUB_BODY[start : start + 8]),
+            expected_params={
+                "Bucket": STUB_BUCKET,
+                "Key": "large",
+                "IfMatch": STUB_ETAG,
+                "Range": ANY,
+            },
+        )
+    local_path = tmp_path.joinpath("large")
+    download_file_from_s3(
+        local_path=local_path,
+        s3_path=Path("large"),
+        s3_head={"ETag": STUB_ETAG, "ContentLength": len(STUB_BODY)},
+    )
+    assert local_path.read_bytes() == STUB_BODY
+
+
+@pytest.mark.unit
+def test_download_file_from_s3_changed_object_raises(s3_stubber, tmp_path) -> None:
+    s3_stubber.add_client_error(
+        "get_object", service_error_code="PreconditionFailed", http_status_code=412
+    )
+    with pytest.raises(S3Error):
+        download_file_from_s3(
+            local_path=tmp_path.joinpath("changed"),
+            s3_path=Path("changed"),
+            s3_head={"ETag": STUB_ETAG, "ContentLength": len(STUB_BODY)},
+        )
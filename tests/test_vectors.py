@@ -1,5 +1,6 @@
 from __future__ import annotations
 import os
+import pickle
 import time
 from pathlib import Path
 
@@ -8,6 +9,7 @@ from pytest import approx
 
 from compsyn.config import CompsynConfig
 from compsyn.s3 import get_s3_client
+from compsyn.vector import BadPickleError, _etag_path, load_vector_pickle
 from compsyn.wordtocolor_vector import WordToColorVector
 from compsyn.trial import Trial
 
@@ -128,3 +130,139 @@ def test_w2cv_s3_pull():
         expected_rgb_ratio=DOG_RGB_RATIO,
         rel=1,  # re-calculating from lower quality images after storing in S3 compressed TODO: discuss
     )
+
+
+PULL_TEST_ETAG = '"pytest-etag"'
+
+
+def _w2cv_for_pull(origin: str) -> WordToColorVector:
+    trial = Trial(
+        experiment_name="test-pull",
+        trial_id="pull",
+        hostname="pytester",
+        trial_timestamp="testoclock",
+    )
+    return WordToColorVector(label="atlantis", trial=trial, metadata={"origin": origin})
+
+
+@pytest.fixture
+def fake_remote(tmp_path, monkeypatch) -> Dict[str, Any]:
+    """
+    stands in for the S3 backend, the remote pickle is a saved vector with metadata origin=remote
+    """
+    monkeypatch.setenv("COMPSYN_WORK_DIR", str(tmp_path))
+    remote_w2cv = _w2cv_for_pull(origin="remote")
+    remote_w2cv.save()
+    remote = {
+        "body": remote_w2cv._local_pickle_path.read_bytes(),
+        "downloads": list(),
+    }
+    remote_w2cv._local_pickle_path.unlink()
+
+    def fake_s3_object_head(s3_path: Path) -> Dict[str, Any]:
+        return {"ETag": PULL_TEST_ETAG, "ContentLength": len(remote["body"])}
+
+    def fake_download_file_from_s3(local_path: Path, s3_path: Path, **kwargs) -> None:
+        remote["downloads"].append(s3_path)
+        local_path.write_bytes(remote["body"])
+
+    monkeypatch.setattr("compsyn.vector.s3_object_head", fake_s3_object_head)
+    monkeypatch.setattr(
+        "compsyn.vector.download_file_from_s3", fake_download_file_from_s3
+    )
+    return remote
+
+
+@pytest.mark.unit
+def test_w2cv_pull_skips_download_when_local_pickle_matches(fake_remote) -> None:
+    w2cv = _w2cv_for_pull(origin="local")
+    w2cv._local_pickle_path.parent.mkdir(exist_ok=True, parents=True)
+    w2cv._local_pickle_path.write_bytes(fake_remote["body"])
+    _etag_path(w2cv._local_pickle_path).write_text(PULL_TEST_ETAG)
+
+    w2cv.pull()
+
+    assert fake_remote["downloads"] == []
+    assert w2cv.metadata["origin"] == "remote"
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("mismatch", ["etag", "size"])
+def test_w2cv_pull_downloads_when_local_pickle_differs(fake_remote, mismatch) -> None:
+    w2cv = _w2cv_for_pull(origin="local")
+    w2cv._local_pickle_path.parent.mkdir(exist_ok=True, parents=True)
+    if mismatch == "etag":
+        w2cv._local_pickle_path.write_bytes(fake_remote["body"])
+        _etag_path(w2cv._local_pickle_path).write_text('"stale-etag"')
+    else:
+        w2cv._local_pickle_path.write_bytes(fake_remote["body"] + b"\0")
+        _etag_path(w2cv._local_pickle_path).write_text(PULL_TEST_ETAG)
+
+    w2cv.pull()
+
+    assert fake_remote["downloads"] == [w2cv.vector_pickle_path]
+    assert _etag_path(w2cv._local_pickle_path).read_text() == PULL_TEST_ETAG
+    assert w2cv.metadata["origin"] == "remote"
+
+
+@pytest.mark.unit
+def test_w2cv_pull_downloads_when_no_local_pickle(fake_remote) -> None:
+    w2cv = _w2cv_for_pull(origin="local")
+
+    w2cv.pull()
+
+    assert fake_remote["downloads"] == [w2cv.vector_pickle_path]
+    assert _etag_path(w2cv._local_pickle_path).read_text() == PULL_TEST_ETAG
+    assert w2cv.metadata["origin"] == "remote"
+
+
+@pytest.mark.unit
+def test_w2cv_pull_keeps_unsynced_local_pickle(fake_remote) -> None:
+    w2cv = _w2cv_for_pull(origin="local")
+    w2cv.save()
+
+    w2cv.pull()
+    assert fake_remote["downloads"] == []
+    assert w2cv.metadata["origin"] == "local"
+
+    w2cv.pull(overwrite=True)
+    assert fake_remote["downloads"] == [w2cv.vector_pickle_path]
+    assert w2cv.metadata["origin"] == "remote"
+
+
+@pytest.mark.unit
+def test_w2cv_save_removes_etag_sidecar(fake_remote) -> None:
+    w2cv = _w2cv_for_pull(origin="local")
+    w2cv.pull()
+    assert _etag_path(w2cv._local_pickle_path).is_file()
+
+    assert w2cv.save() == w2cv._local_pickle_path
+
+    assert not _etag_path(w2cv._local_pickle_path).is_file()
+
+
+@pytest.mark.unit
+def test_load_vector_pickle_reads_compressed_and_legacy_pickles(
+    tmp_path, monkeypatch
+) -> None:
+    monkeypatch.setenv("COMPSYN_WORK_DIR", str(tmp_path))
+    w2cv = _w2cv_for_pull(origin="local")
+    w2cv.save()
+    legacy_pickle_path = tmp_path.joinpath("legacy.pickle")
+    with open(legacy_pickle_path, "wb") as f:
+        # pickles saved before compression was introduced used the default protocol of python 3.7
+        pickle.dump(w2cv, f, protocol=3)
+
+    for pickle_path in [w2cv._local_pickle_path, legacy_pickle_path]:
+        loaded = load_vector_pickle(pickle_path)
+        assert isinstance(loaded, WordToColorVector)
+        assert loaded.label == w2cv.label
+        assert loaded.metadata == w2cv.metadata
+
+
+@pytest.mark.unit
+def test_load_vector_pickle_rejects_empty_file(tmp_path) -> None:
+    empty_pickle_path = tmp_path.joinpath("empty.pickle")
+    empty_pickle_path.touch()
+    with pytest.raises(BadPickleError):
+        load_vector_pickle(empty_pickle_path)